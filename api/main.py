@@ -3,47 +3,36 @@ StudyGPT API Layer - Phase 5
 FastAPI endpoints exposing MultiTaskAgent (Phase 4) functionality.
 """
 
+import asyncio
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
 from app.agents.multitask_agent import MultiTaskAgent
-from app.config import Settings
+from app.config import settings
+from app.models.api_models import AskRequest, QuizRequest, SubmitAnswerRequest
 from dotenv import load_dotenv
 load_dotenv()  # Loads .env file
 
 # --- Initialization (Matches Phase 4 setup) ---
 app = FastAPI(title="StudyGPT API", version="1.0")
-settings = Settings()
 agent = MultiTaskAgent()  # Initializes all Phase 2-4 components
 
 # CORS Configuration (For Flutter frontend)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # browsers cache preflights for a day
 )
 
-# --- Request Models (Phase 1 contract) ---
-class AskRequest(BaseModel):
-    topic: str
-
-class QuizRequest(BaseModel):
-    topic: str
-    difficulty: str = "medium"
-
-class AnswerSubmission(BaseModel):
-    user_answer: str
-    correct_answer: str
-    topic: str
-
-# --- API Endpoints ---
+# --- API Endpoints (request models live in app.models.api_models) ---
 @app.post("/api/ask")
 async def ask_question(request: AskRequest):
     """Endpoint for topic explanations (Phase 4: explain())"""
     try:
-        return {"explanation": agent.explain(request.topic)}
+        return {"explanation": await agent.explain_async(request.topic)}
     except Exception as e:
         raise HTTPException(500, detail=str(e))
 
@@ -51,15 +40,16 @@ async def ask_question(request: AskRequest):
 async def generate_quiz(request: QuizRequest):
     """Endpoint for quiz generation (Phase 4: quiz())"""
     try:
-        return agent.quiz(request.topic)
+        return await agent.quiz_async(request.topic)
     except Exception as e:
         raise HTTPException(500, detail=f"Quiz generation failed: {str(e)}")
 
 @app.post("/api/submit-answer")
-async def submit_answer(answer: AnswerSubmission):
+async def submit_answer(answer: SubmitAnswerRequest):
     """Endpoint for answer evaluation (Phase 4: submit_answer())"""
     try:
-        return agent.submit_answer(
+        return await asyncio.to_thread(
+            agent.submit_answer,
             answer.user_answer,
             answer.correct_answer,
             answer.topic
@@ -71,7 +61,7 @@ async def submit_answer(answer: AnswerSubmission):
 async def get_recommendation():
     """Endpoint for study recommendations (Phase 4: recommend())"""
     try:
-        return {"recommendation": agent.recommend()}
+        return {"recommendation": await asyncio.to_thread(agent.recommend)}
     except Exception as e:
         raise HTTPException(500, detail=str(e))
 
@@ -79,7 +69,7 @@ async def get_recommendation():
 async def get_progress():
     """Endpoint for progress tracking (Phase 4: _load_progress())"""
     try:
-        return agent._load_progress()
+        return await asyncio.to_thread(agent._load_progress)
     except Exception as e:
         raise HTTPException(500, detail=str(e))
 
@@ -94,4 +84,15 @@ async def health_check():
             "vector_store": "loaded" if agent.vector_store else "empty",
             "prompt_engine": "active"
         }
-    }
\ No newline at end of file
+    }
+
+# --- Dev Entrypoint (production runs Gunicorn + Uvicorn workers, see Dockerfile) ---
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",      # 2-4x faster event loop than asyncio default
+        http="httptools"    # C-based HTTP parser
+    )
\ No newline at end of file
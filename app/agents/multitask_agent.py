@@ -3,11 +3,17 @@ MultiTaskAgent - Phase 4
 Core AI logic integrating VectorStore (Phase 2), GeminiClient (Phase 3), and PromptEngine (Phase 3).
 """
 
-import json
+import asyncio
 import logging
+
+import orjson
+from diskcache import Cache
 from pathlib import Path
 from typing import Dict, List, Optional
+from pydantic import ValidationError
 from app.llm.gemini_client import GeminiClient
+from app.models.api_models import QuizResponse, QuizResponseSchema
+from app.llm.llm_cache import LLMCache
 from app.llm.prompt_engine import PromptEngine
 from app.vector_store.vector_store import VectorStore
 
@@ -22,14 +28,36 @@ class MultiTaskAgent:
         self.llm = GeminiClient(max_retries=3)  # Phase 3
         self.prompts = PromptEngine()           # Phase 3
         self.vector_store = VectorStore()       # Phase 2
-        self.progress_file = Path("data/progress.json")
-        self._init_progress_file()
+        self.cache = LLMCache()                 # Phase 4 (response cache)
+        # Shared progress store: diskcache is multi-process safe, so every
+        # Gunicorn worker sees the same records (Phase 4 tracking)
+        self.progress_store = Cache("data/progress")
+        self._migrate_legacy_progress()
+        # Singleflight: identical concurrent topics share one in-flight call
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._inflight_lock = asyncio.Lock()
+
+    def _migrate_legacy_progress(self) -> None:
+        """One-time import of the older on-disk progress formats"""
+        # Single progress.json from the original file handling
+        legacy = Path("data/progress.json")
+        if legacy.exists():
+            try:
+                for topic, entry in orjson.loads(legacy.read_bytes() or b"{}").items():
+                    self.progress_store.set(topic, entry)
+                legacy.rename(legacy.with_suffix(".json.bak"))
+            except Exception as e:
+                logger.warning(f"Legacy progress migration failed: {str(e)}")
 
-    def _init_progress_file(self) -> None:
-        """Ensures progress file exists (matches Phase 2's file handling)"""
-        self.progress_file.parent.mkdir(exist_ok=True)
-        if not self.progress_file.exists():
-            self.progress_file.write_text("{}")
+        # Interim per-topic files (hashed name, topic stored in the record)
+        for path in Path("data/progress").glob("*.json"):
+            try:
+                entry = orjson.loads(path.read_bytes())
+                topic = entry.pop("topic", path.stem)
+                self.progress_store.set(topic, entry)
+                path.unlink()
+            except Exception as e:
+                logger.warning(f"Progress migration failed for {path.name}: {str(e)}")
 
     # --- Core Methods ---
     def explain(self, topic: str) -> str:
@@ -40,12 +68,24 @@ class MultiTaskAgent:
         - GeminiClient (Phase 3) for generation
         """
         try:
-            chunks = self.vector_store.retrieve(topic)  # Phase 2 integration
+            # Phase 2 integration (embedding reused for the cache lookup)
+            chunks, embedding = self.vector_store.retrieve_with_embedding(topic)
+
+            # Cache hit: skip the Gemini round trip entirely
+            key = LLMCache.make_key(
+                topic, [c.get("id", "") for c in chunks], "tutor_prompt.txt"
+            )
+            cached = self.cache.get(key, "tutor_prompt.txt", embedding)
+            if cached is not None:
+                return cached
+
             prompt = self.prompts.render(               # Phase 3 integration
                 "tutor_prompt.txt",
                 {"topic": topic, "context": chunks}
             )
-            return self.llm.generate(prompt)            # Phase 3 integration
+            result = self.llm.generate(prompt)          # Phase 3 integration
+            self.cache.set(key, result, "tutor_prompt.txt", embedding)
+            return result
         except Exception as e:
             logger.error(f"Explanation failed: {str(e)}")
             return "Could not generate explanation. Please try another topic."
@@ -66,13 +106,28 @@ class MultiTaskAgent:
         }
         """
         try:
-            chunks = self.vector_store.retrieve(topic)
+            chunks, embedding = self.vector_store.retrieve_with_embedding(topic)
+
+            # Cache hit: skip the Gemini round trip entirely
+            key = LLMCache.make_key(
+                topic, [c.get("id", "") for c in chunks], "quiz_prompt.txt"
+            )
+            cached = self.cache.get(key, "quiz_prompt.txt", embedding)
+            if cached is not None:
+                return cached
+
             prompt = self.prompts.render(
                 "quiz_prompt.txt",
                 {"topic": topic, "context": chunks}
             )
-            return json.loads(self.llm.generate_structured(prompt))
-        except json.JSONDecodeError:
+            # Constrained decoding + Rust-core validation (Pydantic v2).
+            # The provider gets the constraint-free mirror (protos.Schema
+            # rejects minItems etc.); the real model validates the output.
+            raw = self.llm.generate_structured(prompt, response_schema=QuizResponseSchema)
+            result = QuizResponse.model_validate_json(raw).model_dump()
+            self.cache.set(key, result, "quiz_prompt.txt", embedding)
+            return result
+        except ValidationError:
             logger.error("Quiz JSON parsing failed")
             return {"error": "Failed to generate valid quiz format"}
         except Exception as e:
@@ -127,44 +182,75 @@ class MultiTaskAgent:
             logger.error(f"Recommendation failed: {str(e)}")
             return "Could not generate recommendations. Please try again later."
 
+    # --- Async Wrappers (Phase 5 API integration) ---
+    async def explain_async(self, topic: str) -> str:
+        """explain() with singleflight: concurrent duplicates await one call"""
+        key = f"explain:{topic.lower().strip()}"
+        return await self._singleflight(key, self.explain, topic)
+
+    async def quiz_async(self, topic: str) -> Dict:
+        """quiz() with singleflight: concurrent duplicates await one call"""
+        key = f"quiz:{topic.lower().strip()}"
+        return await self._singleflight(key, self.quiz, topic)
+
+    async def _singleflight(self, key: str, fn, *args):
+        """
+        Deduplicates in-flight work: the first arrival for a key runs `fn`
+        in a worker thread (warming the response cache); later arrivals for
+        the same key await that same future instead of re-running the
+        embedding + FAISS + Gemini pipeline.
+        """
+        async with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+                self._inflight[key] = future
+                future.add_done_callback(
+                    lambda _: self._inflight.pop(key, None)
+                )
+        return await future
+
     # --- Progress Tracking ---
     def _update_progress(self, topic: str, result: Dict) -> Dict:
         """
-        Updates progress JSON (matches Phase 2's file handling).
+        Read-modify-writes the topic's record inside a diskcache transaction,
+        so concurrent updates from any worker process stay consistent.
         Returns updated progress data.
         """
-        progress = self._load_progress()
-        
-        # Initialize topic if needed
-        if topic not in progress:
-            progress[topic] = {
-                "attempts": 0,
-                "correct": 0,
-                "history": []
-            }
-        
-        # Update stats
-        progress[topic]["attempts"] += 1
-        if result["correct"]:
-            progress[topic]["correct"] += 1
-        progress[topic]["history"].append(result)
-        
-        # Limit history size (matches Phase 1 requirements)
-        if len(progress[topic]["history"]) > 10:
-            progress[topic]["history"] = progress[topic]["history"][-10:]
-        
-        # Save (Phase 2-style file ops)
         try:
-            self.progress_file.write_text(json.dumps(progress, indent=2))
-            return progress
+            with self.progress_store.transact():
+                # Initialize topic if needed
+                entry = self.progress_store.get(topic) or {
+                    "attempts": 0,
+                    "correct": 0,
+                    "history": []
+                }
+
+                # Update stats
+                entry["attempts"] += 1
+                if result["correct"]:
+                    entry["correct"] += 1
+                entry["history"].append(result)
+
+                # Limit history size (matches Phase 1 requirements)
+                if len(entry["history"]) > 10:
+                    entry["history"] = entry["history"][-10:]
+
+                self.progress_store.set(topic, entry)
         except Exception as e:
             logger.error(f"Progress save failed: {str(e)}")
             return {}
+        return self._load_progress()
 
     def _load_progress(self) -> Dict:
-        """Loads progress data with Phase 2's error handling"""
+        """Aggregates per-topic records from the shared store"""
+        progress = {}
         try:
-            return json.loads(self.progress_file.read_text())
+            for topic in self.progress_store:
+                entry = self.progress_store.get(topic)
+                if entry is not None:
+                    progress[topic] = entry
         except Exception as e:
             logger.error(f"Progress load failed: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
+        return progress
\ No newline at end of file
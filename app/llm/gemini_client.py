@@ -3,19 +3,109 @@ Gemini API Client - Updated for google-generativeai v0.3.0+ with proper typing
 """
 
 import os
+import queue
+import random
+import threading
 import time
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 from google.generativeai.types import GenerationConfig
 
+from app.utils.error_handler import LLMError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Only transient upstream failures are worth retrying; everything else
+# (auth, bad request, safety blocks) fails fast
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    TimeoutError,
+    ValueError,  # genuinely empty response from Gemini
+)
+
+# Candidate finish reasons that mean the content was blocked; retrying a
+# blocked prompt is deterministic failure, so these raise LLMError instead
+_BLOCK_FINISH_REASONS = ("SAFETY", "RECITATION", "BLOCKLIST", "PROHIBITED_CONTENT", "SPII")
+
+class _BatchDispatcher:
+    """
+    Coalesces concurrent generate() calls into small batches.
+
+    Callers block on a Future while a single worker thread drains the queue
+    every `window_ms` (or when `batch_size` requests are pending) and fires
+    the whole batch through a shared thread pool. Each prompt keeps its own
+    upstream request, so there is no cross-contamination between batched
+    prompts; the win is amortized dispatch and a bounded, connection-warm
+    pool under concurrent load.
+    """
+
+    def __init__(self, send_fn, batch_size: int = 8, window_ms: int = 25):
+        self._send = send_fn
+        self.batch_size = batch_size
+        self.window = window_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._worker_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, prompt: str) -> str:
+        """Enqueue a prompt and block until its response arrives"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        """
+        Starts the drain thread lazily in the current process. Threads do not
+        survive a Gunicorn --preload fork, so a thread started in the master
+        would leave every worker enqueuing to a queue nobody drains; guarding
+        on the pid gives each process its own queue, pool and drain thread.
+        """
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid == os.getpid():
+                return
+            # Drop any state inherited from the parent process
+            self._queue = queue.Queue()
+            self._pool = ThreadPoolExecutor(max_workers=self.batch_size)
+            threading.Thread(target=self._run, daemon=True).start()
+            self._worker_pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for prompt, future in batch:
+                self._pool.submit(self._dispatch, prompt, future)
+
+    def _dispatch(self, prompt: str, future: Future) -> None:
+        try:
+            future.set_result(self._send(prompt))
+        except Exception as e:
+            future.set_exception(e)
+
+
 class GeminiClient:
     def __init__(
         self,
@@ -33,6 +123,16 @@ class GeminiClient:
         self.max_output_tokens = max_output_tokens
         self.model = self._configure_client()
 
+        # Optional request batching (feature flag: determinism per prompt is
+        # preserved, but keep it opt-in for easy rollback)
+        self._batcher = None
+        if os.getenv("GEMINI_BATCH_ENABLED", "0") == "1":
+            self._batcher = _BatchDispatcher(
+                self._generate_with_retries,
+                batch_size=int(os.getenv("GEMINI_BATCH_SIZE", "8")),
+                window_ms=int(os.getenv("GEMINI_BATCH_WINDOW_MS", "25"))
+            )
+
     def _configure_client(self):
         """Configure with proper SDK initialization"""
         api_key = os.getenv("GEMINI_API_KEY")
@@ -53,37 +153,82 @@ class GeminiClient:
 
     def generate(self, prompt: str) -> str:
         """
-        Generate content with proper response handling
+        Generate content with proper response handling.
+        Routes through the batch dispatcher when batching is enabled.
         """
+        if self._batcher is not None:
+            return self._batcher.submit(prompt)
+        return self._generate_with_retries(prompt)
+
+    def _generate_with_retries(
+        self,
+        prompt: str,
+        generation_config: Optional[GenerationConfig] = None
+    ) -> str:
+        """Single-prompt generation with the retry loop"""
         last_error = None
-        
+
         for attempt in range(self.max_retries):
             try:
-                response = self.model.generate_content(prompt)
-                
+                response = self.model.generate_content(
+                    prompt, generation_config=generation_config
+                )
+
+                # Blocked prompts/candidates fail fast: response.text would
+                # raise a retryable ValueError for these, so check first
+                feedback = getattr(response, "prompt_feedback", None)
+                if feedback is not None and getattr(feedback, "block_reason", 0):
+                    raise LLMError(
+                        f"Prompt blocked by safety filter: {feedback.block_reason}"
+                    )
+                if response.candidates:
+                    finish = response.candidates[0].finish_reason
+                    if getattr(finish, "name", str(finish)) in _BLOCK_FINISH_REASONS:
+                        raise LLMError(f"Response blocked (finish_reason={finish})")
+
                 # Proper response handling
                 if not response.text:
                     raise ValueError("Empty response from Gemini")
-                
+
                 return response.text
                 
-            except Exception as e:
+            except _RETRYABLE_ERRORS as e:
                 last_error = e
-                wait_time = min(2 ** attempt, 10)
                 logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-                time.sleep(wait_time)
-                
+                if attempt + 1 == self.max_retries:
+                    break
+                # Jitter spreads concurrent retries so N clients don't
+                # re-stampede a rate-limited backend in lockstep
+                wait_time = min(2 ** attempt, 10)
+                time.sleep(wait_time + random.uniform(0, wait_time / 2))
+
         raise RuntimeError(
             f"Failed after {self.max_retries} attempts. Last error: {str(last_error)}"
         )
 
-    def generate_structured(self, prompt: str) -> str:
+    def generate_structured(self, prompt: str, response_schema=None) -> str:
         """
-        Generate structured JSON output
+        Generate structured JSON output.
+
+        When a Pydantic model class is passed, Gemini's constrained decoding
+        (response_mime_type + response_schema) guarantees well-formed JSON,
+        so no round trip is wasted on malformed output. Without a schema,
+        falls back to the prompt-engineered instruction.
         """
+        if response_schema is not None:
+            config = GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                temperature=self.temperature,
+                max_output_tokens=self.max_output_tokens
+            )
+            # Bypasses the batcher: the per-call config differs from the
+            # model's default
+            return self._generate_with_retries(prompt, generation_config=config)
+
         structured_prompt = f"""{prompt}
-        
+
         IMPORTANT: Respond with ONLY valid JSON formatted exactly as specified.
         Do not include any markdown formatting or additional explanations."""
-        
+
         return self.generate(structured_prompt)
\ No newline at end of file
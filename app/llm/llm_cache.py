@@ -0,0 +1,124 @@
+"""
+LLM Response Cache - Phase 4 optimization
+Exact + semantic caching of Gemini responses for MultiTaskAgent.
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+from cachetools import TTLCache
+from diskcache import Cache
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """
+    Two-level response cache keyed on the full generation inputs.
+
+    Exact hits: sha256(normalized topic + sorted chunk ids + template name)
+    looked up in an in-process TTLCache, falling back to a diskcache.Cache
+    that persists across restarts.
+
+    Semantic hits: the query embedding already computed for retrieval is kept
+    in a per-template FAISS IndexFlatIP; a new query whose cosine similarity
+    to a cached query exceeds the threshold reuses that entry's response
+    without touching Gemini.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "data/llm_cache",
+        maxsize: int = 1024,
+        ttl: int = 3600,
+        similarity_threshold: float = 0.95
+    ):
+        self.similarity_threshold = similarity_threshold
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._disk = Cache(cache_dir)
+        # template_name -> {"index": IndexFlatIP, "keys": [key, ...]}
+        self._semantic: Dict[str, Dict] = {}
+
+    @staticmethod
+    def make_key(topic: str, chunk_ids: List[str], template_name: str) -> str:
+        """Stable key over normalized topic + retrieved chunks + template"""
+        payload = "|".join([
+            topic.lower().strip(),
+            ",".join(sorted(chunk_ids)),
+            template_name
+        ])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(
+        self,
+        key: str,
+        template_name: str,
+        embedding: Optional[np.ndarray] = None
+    ) -> Optional[Any]:
+        """Return cached response for an exact or semantic hit, else None"""
+        # Exact hit (memory, then disk with promotion)
+        if key in self._memory:
+            return self._memory[key]
+        value = self._disk.get(key)
+        if value is not None:
+            self._memory[key] = value
+            return value
+
+        # Semantic hit on the query embedding
+        if embedding is None:
+            return None
+        entry = self._semantic.get(template_name)
+        if entry is None or entry["index"].ntotal == 0:
+            return None
+        try:
+            query = self._normalize(embedding)
+            similarities, indices = entry["index"].search(query, 1)
+            if similarities[0][0] >= self.similarity_threshold:
+                cached_key = entry["keys"][indices[0][0]]
+                value = self._memory.get(cached_key) or self._disk.get(cached_key)
+                if value is not None:
+                    logger.info(
+                        f"Semantic cache hit (sim={similarities[0][0]:.3f})"
+                    )
+                return value
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+        return None
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        template_name: str,
+        embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """Store a response under its key and (optionally) its embedding"""
+        self._memory[key] = value
+        try:
+            self._disk.set(key, value)
+        except Exception as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+
+        if embedding is None:
+            return
+        try:
+            entry = self._semantic.get(template_name)
+            if entry is None:
+                entry = {
+                    "index": faiss.IndexFlatIP(embedding.shape[-1]),
+                    "keys": []
+                }
+                self._semantic[template_name] = entry
+            entry["index"].add(self._normalize(embedding))
+            entry["keys"].append(key)
+        except Exception as e:
+            logger.warning(f"Semantic cache write failed: {str(e)}")
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """Unit-normalize so inner product equals cosine similarity"""
+        vec = np.array(embedding, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
@@ -25,8 +25,15 @@ class PromptEngine:
         self.env = Environment(
             loader=FileSystemLoader(self.templates_dir),
             trim_blocks=True,  # Consistent with Phase 2's whitespace handling
-            lstrip_blocks=True
+            lstrip_blocks=True,
+            auto_reload=False,  # Templates are fixed; never re-stat mtimes
+            cache_size=-1
         )
+        # Pre-resolve compiled templates so render() skips loader lookups
+        self._templates = {
+            name: self.env.get_template(name)
+            for name in ("tutor_prompt.txt", "quiz_prompt.txt", "recommend_prompt.txt")
+        }
 
     def _verify_templates(self) -> None:
         """Validates templates exist, mirroring Phase 2's file checks"""
@@ -53,8 +60,9 @@ class PromptEngine:
             Prompt ready for GeminiClient (Phase 3)
         """
         try:
-            template = self.env.get_template(template_name)
-            
+            template = self._templates.get(template_name) or self.env.get_template(template_name)
+
+
             # Phase 2 compatibility: Ensure context matches chunk format
             if "context" in context and isinstance(context["context"], list):
                 context["chunks"] = [chunk["text"] for chunk in context["context"]]
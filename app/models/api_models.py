@@ -4,7 +4,7 @@ Updated for Pydantic v2 compatibility
 """
 
 from typing import List, Dict, Literal, Optional, Annotated
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from pydantic.types import conint
 
 # --------------------------
@@ -13,6 +13,8 @@ from pydantic.types import conint
 
 class AskRequest(BaseModel):
     """Request model for /api/ask endpoint"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     topic: str = Field(
         ...,
         min_length=1,
@@ -23,6 +25,8 @@ class AskRequest(BaseModel):
 
 class QuizRequest(BaseModel):
     """Request model for /api/quiz endpoint"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     topic: str = Field(
         ...,
         min_length=1,
@@ -37,6 +41,8 @@ class QuizRequest(BaseModel):
 
 class SubmitAnswerRequest(BaseModel):
     """Request model for /api/submit-answer endpoint"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     topic: str = Field(..., description="Question topic")
     user_answer: str = Field(..., description="Student's answer")
     correct_answer: str = Field(..., description="Expected correct answer")
@@ -105,6 +111,26 @@ class ProgressSummaryResponse(BaseModel):
         }]
     )
 
+# --------------------------
+# PROVIDER SCHEMA MIRRORS
+# --------------------------
+
+class QuizQuestionSchema(BaseModel):
+    """
+    Constraint-free mirror of QuizQuestion for Gemini's response_schema.
+    protos.Schema rejects the minItems/maxItems and numeric bounds that the
+    Field constraints above emit, so the provider gets this plain shape and
+    QuizResponse still validates the parsed output locally.
+    """
+    question: str
+    options: List[str]
+    correct_index: int
+    explanation: str
+
+class QuizResponseSchema(BaseModel):
+    """Constraint-free mirror of QuizResponse for Gemini's response_schema"""
+    questions: List[QuizQuestionSchema]
+
 # --------------------------
 # ERROR MODELS
 # --------------------------
@@ -3,15 +3,19 @@ StudyGPT Vector Store for Semantic Search
 Handles FAISS index and text chunk retrieval.
 """
 
-import json
+import hashlib
 import logging
+import os
 import numpy as np
+import orjson
 import faiss
 from pathlib import Path
 from typing import List, Dict, Optional
 import google.generativeai as genai
+from cachetools import LRUCache
+from diskcache import Cache
 from dotenv import load_dotenv
-from app.config import Settings
+from app.config import Settings, settings as default_settings
 load_dotenv()  # Loads .env file
 
 logger = logging.getLogger(__name__)
@@ -19,9 +23,18 @@ logger = logging.getLogger(__name__)
 class VectorStore:
     def __init__(self, settings: Optional[Settings] = None):
         """Initialize with paths from settings or defaults"""
-        self.settings = settings or Settings()
+        # Shared singleton by default: avoids re-reading .env and re-running
+        # validators on every construction
+        self.settings = settings or default_settings
         self.index = None
-        self.chunks = []
+        self.chunks = ()
+        # Offset-indexed JSONL chunk store (preferred over self.chunks)
+        self._chunks_fd = None
+        self._chunks_size = 0
+        self._offsets = None
+        # Query-embedding cache: repeat topics skip the embedding API call
+        self._embed_cache: LRUCache = LRUCache(maxsize=2048)
+        self._embed_disk = Cache("data/embed_cache")
         self._load_data()
 
     def _load_data(self) -> None:
@@ -30,33 +43,97 @@ class VectorStore:
             # Load FAISS index
             index_path = Path(self.settings.INDEX_PATH)
             if index_path.exists():
-                self.index = faiss.read_index(str(index_path))
+                # Memory-map read-only so the OS page cache backs the index
+                # and Gunicorn workers share one copy instead of N heaps
+                self.index = faiss.read_index(
+                    str(index_path),
+                    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                )
+                if hasattr(self.index, 'hnsw'):
+                    self.index.hnsw.efSearch = 64  # recall/latency knob
             
-            # Load text chunks
+            # Load text chunks: prefer the offset-indexed JSONL so per-query
+            # lookups seek to the k matched lines instead of holding the
+            # whole corpus as Python dicts in every worker
+            jsonl_path = Path(self.settings.CHUNKS_JSONL_PATH)
+            offsets_path = Path(self.settings.CHUNKS_OFFSETS_PATH)
             chunks_path = Path(self.settings.CHUNKS_FILE_PATH)
-            if chunks_path.exists():
-                with open(chunks_path, 'r') as f:
-                    self.chunks = json.load(f)
-            
-            logger.info(f"Loaded {len(self.chunks)} chunks from knowledge base")
+            if jsonl_path.exists() and offsets_path.exists():
+                self._chunks_fd = os.open(str(jsonl_path), os.O_RDONLY)
+                self._chunks_size = jsonl_path.stat().st_size
+                self._offsets = np.load(offsets_path, mmap_mode='r')
+            elif chunks_path.exists():
+                # Legacy single-file format from older ingestion runs
+                # (tuple: immutable, slightly faster indexing than a list)
+                with open(chunks_path, 'rb') as f:
+                    self.chunks = tuple(orjson.loads(f.read()))
+
+            logger.info(f"Loaded {self.chunk_count} chunks from knowledge base")
         except Exception as e:
             logger.error(f"Data loading failed: {str(e)}")
             self.index = None
-            self.chunks = []
+            self.chunks = ()
+            self._chunks_fd = None
+            self._chunks_size = 0
+            self._offsets = None
+
+    @property
+    def chunk_count(self) -> int:
+        """Number of chunks in the knowledge base"""
+        if self._offsets is not None:
+            return len(self._offsets)
+        return len(self.chunks)
+
+    def _get_chunk(self, idx: int) -> Dict:
+        """Fetch one chunk by index (JSONL read, or the legacy in-memory list)"""
+        if self._offsets is not None:
+            # os.pread is positional: no shared file offset, so concurrent
+            # reads from threads or forked Gunicorn workers cannot race
+            start = int(self._offsets[idx])
+            end = (
+                int(self._offsets[idx + 1])
+                if idx + 1 < len(self._offsets)
+                else self._chunks_size
+            )
+            line = os.pread(self._chunks_fd, end - start, start)
+            return orjson.loads(line)
+        return self.chunks[idx]
 
     def _get_embedding(self, text: str) -> np.ndarray:
-        """Generate embedding for query (matches ingestion method)"""
+        """Generate embedding for query (matches ingestion method), cached"""
+        key = hashlib.sha1(text.encode()).hexdigest()
+        try:
+            embedding = self._embed_cache.get(key)
+            if embedding is None:
+                # Disk hit (survives restarts); stored as raw float32 bytes
+                raw = self._embed_disk.get(key)
+                if raw is not None:
+                    embedding = np.frombuffer(raw, dtype='float32').reshape(1, -1)
+                    self._embed_cache[key] = embedding
+            if embedding is not None:
+                return embedding
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+
         try:
             result = genai.embed_content(
                 model="models/text-embedding-004",
                 content=text,
                 task_type="retrieval_query"
             )
-            return np.array(result['embedding'], dtype='float32').reshape(1, -1)
+            embedding = np.array(result['embedding'], dtype='float32').reshape(1, -1)
+            faiss.normalize_L2(embedding)  # unit vector: IP == cosine (matches index)
         except Exception as e:
             logger.error(f"Embedding generation failed: {str(e)}")
             raise
 
+        try:
+            self._embed_cache[key] = embedding
+            self._embed_disk.set(key, embedding.tobytes())
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+        return embedding
+
     def retrieve(self, query: str, k: int = 3) -> List[Dict]:
         """
         Retrieve top-k relevant chunks for a query
@@ -68,31 +145,41 @@ class VectorStore:
                 "metadata": dict
             }]
         """
-        if not self.index or not self.chunks:
+        chunks, _ = self.retrieve_with_embedding(query, k)
+        return chunks
+
+    def retrieve_with_embedding(self, query: str, k: int = 3) -> tuple:
+        """
+        Retrieve top-k chunks plus the query embedding used for the search,
+        so callers (e.g. the LLM response cache) can reuse it without paying
+        a second embedding round trip.
+        Returns:
+            (chunks, query_embedding) - embedding is None if retrieval failed
+        """
+        # `is None` avoids FAISS __bool__/__len__ overhead on every call
+        if self.index is None or self.chunk_count == 0:
             logger.warning("Knowledge base not loaded")
-            return []
+            return [], None
 
         try:
             # Embed query
             query_embedding = self._get_embedding(query)
-            
+
             # Search FAISS index
             distances, indices = self.index.search(query_embedding, k)
-            
-            # Return matched chunks
-            results = []
-            for idx in indices[0]:
-                if 0 <= idx < len(self.chunks):
-                    results.append(self.chunks[idx])
-            
-            return results
+
+            # Return matched chunks: vectorized bounds mask instead of a
+            # per-element Python check (FAISS pads missing results with -1)
+            hits = indices[0]
+            valid = hits[(hits >= 0) & (hits < self.chunk_count)]
+            return [self._get_chunk(idx) for idx in valid.tolist()], query_embedding
         except Exception as e:
             logger.error(f"Retrieval failed for query '{query}': {str(e)}")
-            return []
+            return [], None
 
     def health_check(self) -> Dict:
         """Check if vector store is operational"""
         return {
             "index_loaded": self.index is not None,
-            "chunks_loaded": len(self.chunks) > 0
+            "chunks_loaded": self.chunk_count > 0
         }
\ No newline at end of file
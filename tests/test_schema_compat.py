@@ -0,0 +1,24 @@
+"""
+Offline check that the quiz response schema converts to a Gemini
+generation config. protos.Schema rejects JSON-schema keywords such as
+minItems/maxItems, so a constrained model here would fail client-side on
+every /api/quiz call before any network I/O - this catches a schema/SDK
+mismatch without hitting the API.
+"""
+
+import pytest
+
+generation_types = pytest.importorskip(
+    "google.generativeai.types.generation_types"
+)
+
+from app.models.api_models import QuizResponseSchema
+
+
+def test_quiz_schema_converts_to_generation_config():
+    """The exact schema quiz() sends must survive the SDK's conversion"""
+    config = generation_types.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=QuizResponseSchema
+    )
+    generation_types.to_generation_config_dict(config)